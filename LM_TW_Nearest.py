@@ -0,0 +1,172 @@
+# LM GPTransferWeights: Transfer weights from one mesh to grease pencil strokes
+# Copyright (C) 2025 Luca Malisan
+
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful, but
+# WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTIBILITY or FITNESS FOR A PARTICULAR PURPOSE. See the GNU
+# General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program. If not, see <http://www.gnu.org/licenses/>.
+
+# Nearest vertex search used by the transfer operator.
+# Two engines are available: a NumPy brute force kernel working on cache-sized tiles,
+# that is faster on small meshes, and a KD-tree spatial index, that is faster on dense meshes.
+# The AUTO engine picks one of them using costs measured by a small calibration benchmark.
+
+import math
+import time
+
+import numpy as np
+from mathutils import kdtree
+
+# number of point/vertex pairs processed in a single brute force tile.
+# 2**15 pairs (a 256 KB distance tile, about 1 MB with its temporaries) was measured faster than smaller tiles
+# on small meshes with many points: with smaller tiles, the NumPy overhead of each call costs more than the cache gain
+TILE_PAIRS = 2 ** 15
+
+# costs measured by calibrate(), computed the first time AUTO is used
+_calibration = None
+
+
+def vertices_local_co(vertices):
+    """Return the local positions of mesh vertices as a (N, 3) float64 array"""
+    co = np.empty(len(vertices) * 3, dtype=np.float32)
+    vertices.foreach_get("co", co)
+    return co.reshape(-1, 3).astype(np.float64)
+
+
+def local_to_world(co, matrix_world):
+    """Transform a (N, 3) array of local positions to world space"""
+    matrix = np.array(matrix_world, dtype=np.float64)
+    return co @ matrix[:3, :3].T + matrix[:3, 3]
+
+
+def vertices_to_array(vertices, matrix_world):
+    """Return the world space positions of mesh vertices as a (N, 3) float64 array"""
+    return local_to_world(vertices_local_co(vertices), matrix_world)
+
+
+def nearest_vertices_brute_force(points, vertices, max_distance = 0.0):
+    """Find the index of the nearest vertex of each point, testing all pairs in tiles.
+    Points farther than max_distance get -1 (max_distance 0 disables the check)"""
+    result = np.full(len(points), -1, dtype=np.int64)
+    if len(points) == 0 or len(vertices) == 0:
+        return result
+
+    # move the origin to the center of the vertices: the expanded distance formula below
+    # loses precision when coordinates are large compared to the distances
+    origin = vertices.mean(axis=0)
+    vertices = vertices - origin
+    vertices_sq = np.einsum("ij,ij->i", vertices, vertices)
+    max_distance_sq = max_distance * max_distance if max_distance > 0 else np.inf
+
+    # process points in chunks, so every tile of distances fits in cache
+    chunk_size = max(1, TILE_PAIRS // len(vertices))
+    for start in range(0, len(points), chunk_size):
+        chunk = points[start:start + chunk_size] - origin
+
+        # squared distances |p|^2 - 2 p.v + |v|^2 for the whole tile
+        dist_sq = np.einsum("ij,ij->i", chunk, chunk)[:, None] - 2.0 * (chunk @ vertices.T) + vertices_sq[None, :]
+        nearest = np.argmin(dist_sq, axis=1)
+        nearest_dist_sq = dist_sq[np.arange(len(chunk)), nearest]
+
+        # apply the max distance mask to the whole chunk
+        result[start:start + chunk_size] = np.where(nearest_dist_sq < max_distance_sq, nearest, -1)
+
+    return result
+
+
+def build_kdtree(vertices):
+    """Build a KD-tree of the vertices, it can be reused for all the frames where the vertices don't move"""
+    tree = kdtree.KDTree(len(vertices))
+    for index, co in enumerate(vertices):
+        tree.insert(co, index)
+    tree.balance()
+    return tree
+
+
+def nearest_vertices_kdtree(points, tree, max_distance = 0.0):
+    """Find the index of the nearest vertex of each point using a KD-tree built by build_kdtree().
+    Points farther than max_distance get -1 (max_distance 0 disables the check)"""
+    result = np.full(len(points), -1, dtype=np.int64)
+    if len(points) == 0:
+        return result
+
+    if max_distance == 0:
+        max_distance = math.inf
+
+    for point_idx, point_co in enumerate(points):
+        co, index, dist = tree.find(point_co)
+        if index is not None and dist < max_distance:
+            result[point_idx] = index
+
+    return result
+
+
+def calibrate():
+    """Measure the cost of the two engines on random data, it's run only once per session"""
+    global _calibration
+    if _calibration is not None:
+        return _calibration
+
+    rng = np.random.default_rng(0)
+    points = rng.random((2048, 3))
+    vertices = rng.random((512, 3))
+
+    # brute force: cost of a single point/vertex pair
+    start = time.perf_counter()
+    nearest_vertices_brute_force(points, vertices)
+    pair_cost = (time.perf_counter() - start) / (len(points) * len(vertices))
+
+    # KD-tree: cost of inserting a vertex and of querying a point, both scaled by the tree depth
+    tree_vertices = rng.random((4096, 3))
+    depth = math.log2(len(tree_vertices))
+
+    start = time.perf_counter()
+    tree = build_kdtree(tree_vertices)
+    build_cost = (time.perf_counter() - start) / (len(tree_vertices) * depth)
+
+    start = time.perf_counter()
+    for point_co in points:
+        tree.find(point_co)
+    query_cost = (time.perf_counter() - start) / (len(points) * depth)
+
+    _calibration = (pair_cost, build_cost, query_cost)
+    return _calibration
+
+
+def use_brute_force(points_count, vertices_count, tree_built = False):
+    """Return True if the brute force tiles are expected to be faster than the KD-tree.
+    If the tree is already built, only the query cost is counted"""
+    pair_cost, build_cost, query_cost = calibrate()
+    depth = math.log2(max(vertices_count, 2))
+
+    brute_force_time = pair_cost * points_count * vertices_count
+    kdtree_time = query_cost * points_count * depth
+    if not tree_built:
+        kdtree_time += build_cost * vertices_count * depth
+    return brute_force_time < kdtree_time
+
+
+def nearest_vertices(points, vertices, max_distance = 0.0, engine = 'AUTO', tree = None):
+    """Find the index of the nearest vertex of each point (-1 if farther than max_distance).
+    engine can be 'BRUTE_FORCE', 'KDTREE' or 'AUTO'.
+    tree is an optional KD-tree of the vertices, built once by build_kdtree() when the vertices don't change"""
+    if len(points) == 0 or len(vertices) == 0:
+        return np.full(len(points), -1, dtype=np.int64)
+
+    if engine == 'AUTO':
+        engine = 'BRUTE_FORCE' if use_brute_force(len(points), len(vertices), tree is not None) else 'KDTREE'
+
+    if engine == 'BRUTE_FORCE':
+        return nearest_vertices_brute_force(points, vertices, max_distance)
+
+    if tree is None:
+        tree = build_kdtree(vertices)
+    return nearest_vertices_kdtree(points, tree, max_distance)
@@ -19,6 +19,9 @@
 import bpy
 import mathutils
 import bmesh
+import numpy as np
+
+from . import LM_TW_Nearest
 
 class LM_TW_OT_Transfer(bpy.types.Operator):
     """Transfer weights from a mesh to grease pencil strokes"""
@@ -27,6 +30,12 @@ class LM_TW_OT_Transfer(bpy.types.Operator):
     bl_description = "Transfer weights from a mesh to grease pencil strokes"
     bl_options = {'REGISTER', 'UNDO'}
 
+    # source mesh modifiers that only move vertices, without changing topology or weights (supported by the Geometry Nodes engine)
+    deform_modifier_types = {
+        'ARMATURE', 'CAST', 'CORRECTIVE_SMOOTH', 'CURVE', 'DISPLACE', 'HOOK', 'LAPLACIANDEFORM', 'LAPLACIANSMOOTH',
+        'LATTICE', 'MESH_DEFORM', 'SHRINKWRAP', 'SIMPLE_DEFORM', 'SMOOTH', 'SURFACE_DEFORM', 'WARP', 'WAVE',
+    }
+
     # this function is needed in Blender 4.3/4.4 that have a bug preventing writing vertex groups in Grease Pencil object.
     # it converts a temporary attribute to data in the vertex group using geometry nodes
     # weights must be stored in a temporary attribute with a different name
@@ -55,8 +64,11 @@ class LM_TW_OT_Transfer(bpy.types.Operator):
         # Store Named Attribute.Geometry -> Group Output.Geometry
         bl_node_group.links.new(bl_write_attr_node.outputs[0], bl_output_node.inputs[0])
 
+        self.apply_node_group(bl_obj, bl_node_group, "LM TW Copy attribute", to_the_top)
+
+    # apply a geometry nodes group to all keyframes of a grease pencil object, and remove the node group
+    def apply_node_group(self, bl_obj, bl_node_group, bl_modifier_name, to_the_top = False):
         bpy.context.view_layer.objects.active = bl_obj
-        bl_modifier_name = "LM TW Copy attribute"
         # we must apply the modifier to all frames of the grease pencil object
         # so we create a modifier for each frame in each layer
         # for layer in bl_obj.data.layers:
@@ -66,16 +78,298 @@ class LM_TW_OT_Transfer(bpy.types.Operator):
         ###################
         # # Create a new modifier to apply the geometry nodes                
         bl_modifier = bl_obj.modifiers.new(bl_modifier_name, "NODES")
-        if to_the_top:
-            # Move the modifier to the top of the stack
-            while bl_obj.modifiers[0].name != bl_modifier_name:
-                bpy.ops.object.modifier_move_up(modifier=bl_modifier_name)
-        
-        bl_modifier.node_group = bl_node_group
-        bpy.ops.object.modifier_apply(modifier = bl_modifier_name,all_keyframes=True)
+        # the name can get a suffix if a modifier with the same name already exists
+        bl_modifier_name = bl_modifier.name
+        try:
+            if to_the_top:
+                # Move the modifier to the top of the stack
+                while bl_obj.modifiers[0].name != bl_modifier_name:
+                    bpy.ops.object.modifier_move_up(modifier=bl_modifier_name)
+            
+            bl_modifier.node_group = bl_node_group
+            bpy.ops.object.modifier_apply(modifier = bl_modifier_name,all_keyframes=True)
+        finally:
+            # if applying failed, don't leave the modifier and the node group behind
+            if bl_modifier_name in bl_obj.modifiers:
+                bl_obj.modifiers.remove(bl_obj.modifiers[bl_modifier_name])
+            bpy.data.node_groups.remove(bl_node_group)
         ######################
 
-        bpy.data.node_groups.remove(bl_node_group)
+    # create a Combine Matrix node holding a constant matrix (sockets are in column major order)
+    def new_matrix_node(self, bl_node_group, matrix):
+        bl_matrix_node = bl_node_group.nodes.new("FunctionNodeCombineMatrix")
+        for col in range(4):
+            for row in range(4):
+                bl_matrix_node.inputs[col * 4 + row].default_value = matrix[row][col]
+        return bl_matrix_node
+
+    # Geometry Nodes transfer engine (Blender 4.3 and later).
+    # It builds a single node group that samples the source mesh (through an Object Info node) on the grease pencil points,
+    # so the nearest search and the weight sampling run multithreaded in Blender instead of in Python.
+    # The vertex groups must already be initialized in all drawings, so that Store Named Attribute writes to them.
+    # The source mesh is read after its modifiers, so execute() allows only deform modifiers on it (deform_modifier_types).
+    def transfer_using_geometry_nodes(self, context, source, target):
+        bl_node_group = bpy.data.node_groups.new("__transfer_weights", "GeometryNodeTree")
+        try:
+            self.build_transfer_node_group(context, source, target, bl_node_group)
+        except Exception:
+            # don't leave a half built node group behind
+            bpy.data.node_groups.remove(bl_node_group)
+            raise
+
+        # the rest position is needed in both modes, we enable it just while applying the node group
+        add_rest_position = source.add_rest_position_attribute
+        source.add_rest_position_attribute = True
+        try:
+            # the modifier goes on top of the stack, so it reads the original points like the Python engine
+            self.apply_node_group(target, bl_node_group, "LM TW Transfer weights", True)
+        finally:
+            source.add_rest_position_attribute = add_rest_position
+
+    # build the nodes of the Geometry Nodes transfer engine.
+    # It follows the Python engine: distances are measured in world space, points farther than lm_tw_distance,
+    # points of locked layers and locked vertex groups are not changed, and in FRAMES mode points are moved back
+    # by the deformation of the nearest vertex (or face).
+    def build_transfer_node_group(self, context, source, target, bl_node_group):
+        # temporary attributes holding the nearest element of each point and the points that must be changed
+        temp_index_name = "lm_tw_temp_nearest"
+        temp_mask_name = "lm_tw_temp_mask"
+
+        # nearest vertex, or nearest face (point attributes are averaged on the face domain, like the Python engine does)
+        domain = 'POINT' if context.scene.lm_tw_nearest == 'VERTEX' else 'FACE'
+        max_distance = context.scene.lm_tw_distance
+
+        # groups to transfer: unlocked groups that exist in the source mesh
+        vgroup_names = [group.name for group in target.vertex_groups if not group.lock_weight and group.name in source.vertex_groups]
+        locked_layer_names = [layer.name for layer in target.data.layers if layer.lock]
+
+        bl_node_group.is_modifier = True
+
+        bl_node_group.interface.new_socket("Geometry", in_out = "INPUT", socket_type = "NodeSocketGeometry")
+        bl_node_group.interface.new_socket("Geometry", in_out = "OUTPUT", socket_type = "NodeSocketGeometry")
+
+        nodes = bl_node_group.nodes
+        links = bl_node_group.links
+
+        bl_input_node = nodes.new("NodeGroupInput")
+        bl_output_node = nodes.new("NodeGroupOutput")
+        bl_position_node = nodes.new("GeometryNodeInputPosition")
+
+        bl_object_info_node = nodes.new("GeometryNodeObjectInfo")
+        bl_object_info_node.transform_space = 'ORIGINAL'
+        bl_object_info_node.inputs["Object"].default_value = source
+
+        # world matrices, like in the Python engine
+        if context.scene.lm_tw_mode == 'CURRENT':
+            # Original mode: the matrices of the current frame for all keyframes
+            source_matrix = self.new_matrix_node(bl_node_group, source.matrix_world).outputs[0]
+            target_matrix = self.new_matrix_node(bl_node_group, target.matrix_world).outputs[0]
+            target_inverse_matrix = self.new_matrix_node(bl_node_group, target.matrix_world.inverted()).outputs[0]
+        else:
+            # Each frame mode: the matrices of each keyframe (modifier_apply evaluates the scene on every keyframe)
+            source_matrix = bl_object_info_node.outputs["Transform"]
+
+            bl_self_object_node = nodes.new("GeometryNodeSelfObject")
+            bl_target_info_node = nodes.new("GeometryNodeObjectInfo")
+            links.new(bl_self_object_node.outputs[0], bl_target_info_node.inputs["Object"])
+            target_matrix = bl_target_info_node.outputs["Transform"]
+
+            bl_invert_matrix_node = nodes.new("FunctionNodeInvertMatrix")
+            links.new(target_matrix, bl_invert_matrix_node.inputs["Matrix"])
+            target_inverse_matrix = bl_invert_matrix_node.outputs["Matrix"]
+
+        ### Source mesh in world space
+
+        # rest position of the source mesh (the attribute is added to the evaluated mesh by add_rest_position_attribute)
+        bl_rest_attr_node = nodes.new("GeometryNodeInputNamedAttribute")
+        bl_rest_attr_node.data_type = 'FLOAT_VECTOR'
+        bl_rest_attr_node.inputs["Name"].default_value = "rest_position"
+
+        bl_rest_world_node = nodes.new("FunctionNodeTransformPoint")
+        links.new(bl_rest_attr_node.outputs["Attribute"], bl_rest_world_node.inputs["Vector"])
+        links.new(source_matrix, bl_rest_world_node.inputs["Transform"])
+
+        bl_source_world_node = nodes.new("FunctionNodeTransformPoint")
+        bl_source_set_position_node = nodes.new("GeometryNodeSetPosition")
+        links.new(bl_object_info_node.outputs["Geometry"], bl_source_set_position_node.inputs["Geometry"])
+        links.new(source_matrix, bl_source_world_node.inputs["Transform"])
+        links.new(bl_source_world_node.outputs["Vector"], bl_source_set_position_node.inputs["Position"])
+        if context.scene.lm_tw_mode == 'CURRENT':
+            # Original mode: mesh in rest position
+            links.new(bl_rest_attr_node.outputs["Attribute"], bl_source_world_node.inputs["Vector"])
+        else:
+            # Each frame mode: mesh in animated position
+            links.new(bl_position_node.outputs["Position"], bl_source_world_node.inputs["Vector"])
+
+        source_geometry = bl_source_set_position_node.outputs["Geometry"]
+
+        ### Nearest element of each grease pencil point
+
+        bl_point_world_node = nodes.new("FunctionNodeTransformPoint")
+        links.new(bl_position_node.outputs["Position"], bl_point_world_node.inputs["Vector"])
+        links.new(target_matrix, bl_point_world_node.inputs["Transform"])
+        point_world = bl_point_world_node.outputs["Vector"]
+
+        bl_sample_nearest_node = nodes.new("GeometryNodeSampleNearest")
+        bl_sample_nearest_node.domain = 'POINT'
+        if domain == 'FACE':
+            # like the Python engine, the nearest face is the one with the nearest center:
+            # we search the nearest of the points created at the face centers (point index = face index)
+            bl_face_centers_node = nodes.new("GeometryNodeMeshToPoints")
+            bl_face_centers_node.mode = 'FACES'
+            links.new(source_geometry, bl_face_centers_node.inputs["Mesh"])
+            links.new(bl_face_centers_node.outputs["Points"], bl_sample_nearest_node.inputs["Geometry"])
+        else:
+            links.new(source_geometry, bl_sample_nearest_node.inputs["Geometry"])
+        links.new(point_world, bl_sample_nearest_node.inputs["Sample Position"])
+
+        # Group Input.Geometry -> Store Named Attribute (nearest index)
+        bl_store_index_node = nodes.new("GeometryNodeStoreNamedAttribute")
+        bl_store_index_node.data_type = 'INT'
+        bl_store_index_node.domain = 'POINT'
+        bl_store_index_node.inputs["Name"].default_value = temp_index_name
+        links.new(bl_input_node.outputs[0], bl_store_index_node.inputs["Geometry"])
+        links.new(bl_sample_nearest_node.outputs["Index"], bl_store_index_node.inputs["Value"])
+        geometry = bl_store_index_node.outputs["Geometry"]
+
+        bl_read_index_node = nodes.new("GeometryNodeInputNamedAttribute")
+        bl_read_index_node.data_type = 'INT'
+        bl_read_index_node.inputs["Name"].default_value = temp_index_name
+
+        ### Points that must be changed: nearer than max distance and not in a locked layer
+
+        mask_outputs = []
+        if max_distance > 0:
+            # distance from the nearest vertex (or the face center)
+            bl_nearest_co_node = nodes.new("GeometryNodeSampleIndex")
+            bl_nearest_co_node.data_type = 'FLOAT_VECTOR'
+            bl_nearest_co_node.domain = domain
+            links.new(source_geometry, bl_nearest_co_node.inputs["Geometry"])
+            links.new(bl_position_node.outputs["Position"], bl_nearest_co_node.inputs["Value"])
+            links.new(bl_read_index_node.outputs["Attribute"], bl_nearest_co_node.inputs["Index"])
+
+            bl_distance_node = nodes.new("ShaderNodeVectorMath")
+            bl_distance_node.operation = 'DISTANCE'
+            links.new(bl_nearest_co_node.outputs["Value"], bl_distance_node.inputs[0])
+            links.new(point_world, bl_distance_node.inputs[1])
+
+            bl_compare_node = nodes.new("FunctionNodeCompare")
+            bl_compare_node.data_type = 'FLOAT'
+            bl_compare_node.operation = 'LESS_THAN'
+            bl_compare_node.inputs[1].default_value = max_distance
+            links.new(bl_distance_node.outputs["Value"], bl_compare_node.inputs[0])
+            mask_outputs.append(bl_compare_node.outputs["Result"])
+
+        if locked_layer_names:
+            locked_output = None
+            for layer_name in locked_layer_names:
+                bl_layer_node = nodes.new("GeometryNodeInputNamedLayerSelection")
+                bl_layer_node.inputs["Name"].default_value = layer_name
+                if locked_output is None:
+                    locked_output = bl_layer_node.outputs["Selection"]
+                else:
+                    bl_or_node = nodes.new("FunctionNodeBooleanMath")
+                    bl_or_node.operation = 'OR'
+                    links.new(locked_output, bl_or_node.inputs[0])
+                    links.new(bl_layer_node.outputs["Selection"], bl_or_node.inputs[1])
+                    locked_output = bl_or_node.outputs["Boolean"]
+
+            bl_not_node = nodes.new("FunctionNodeBooleanMath")
+            bl_not_node.operation = 'NOT'
+            links.new(locked_output, bl_not_node.inputs[0])
+            mask_outputs.append(bl_not_node.outputs["Boolean"])
+
+        mask = None
+        if mask_outputs:
+            mask_output = mask_outputs[0]
+            if len(mask_outputs) > 1:
+                bl_and_node = nodes.new("FunctionNodeBooleanMath")
+                bl_and_node.operation = 'AND'
+                links.new(mask_outputs[0], bl_and_node.inputs[0])
+                links.new(mask_outputs[1], bl_and_node.inputs[1])
+                mask_output = bl_and_node.outputs["Boolean"]
+
+            bl_store_mask_node = nodes.new("GeometryNodeStoreNamedAttribute")
+            bl_store_mask_node.data_type = 'BOOLEAN'
+            bl_store_mask_node.domain = 'POINT'
+            bl_store_mask_node.inputs["Name"].default_value = temp_mask_name
+            links.new(geometry, bl_store_mask_node.inputs["Geometry"])
+            links.new(mask_output, bl_store_mask_node.inputs["Value"])
+            geometry = bl_store_mask_node.outputs["Geometry"]
+
+            bl_read_mask_node = nodes.new("GeometryNodeInputNamedAttribute")
+            bl_read_mask_node.data_type = 'BOOLEAN'
+            bl_read_mask_node.inputs["Name"].default_value = temp_mask_name
+            mask = bl_read_mask_node.outputs["Attribute"]
+
+        ### Weights: one Sample Index for each vertex group
+
+        for vgroup_name in vgroup_names:
+            # vertices not in the group have weight 0, like in the Python engine
+            bl_weight_attr_node = nodes.new("GeometryNodeInputNamedAttribute")
+            bl_weight_attr_node.data_type = 'FLOAT'
+            bl_weight_attr_node.inputs["Name"].default_value = vgroup_name
+
+            bl_sample_weight_node = nodes.new("GeometryNodeSampleIndex")
+            bl_sample_weight_node.data_type = 'FLOAT'
+            bl_sample_weight_node.domain = domain
+            links.new(source_geometry, bl_sample_weight_node.inputs["Geometry"])
+            links.new(bl_weight_attr_node.outputs["Attribute"], bl_sample_weight_node.inputs["Value"])
+            links.new(bl_read_index_node.outputs["Attribute"], bl_sample_weight_node.inputs["Index"])
+
+            bl_store_weight_node = nodes.new("GeometryNodeStoreNamedAttribute")
+            bl_store_weight_node.data_type = 'FLOAT'
+            bl_store_weight_node.domain = 'POINT'
+            bl_store_weight_node.inputs["Name"].default_value = vgroup_name
+            links.new(geometry, bl_store_weight_node.inputs["Geometry"])
+            links.new(bl_sample_weight_node.outputs["Value"], bl_store_weight_node.inputs["Value"])
+            if mask is not None:
+                links.new(mask, bl_store_weight_node.inputs["Selection"])
+            geometry = bl_store_weight_node.outputs["Geometry"]
+
+        ### Each frame mode: move the points back by the deformation of the nearest vertex (or face)
+
+        if context.scene.lm_tw_mode == 'FRAMES' and vgroup_names:
+            # deformation = animated position - rest position, evaluated on the source mesh
+            bl_deform_node = nodes.new("ShaderNodeVectorMath")
+            bl_deform_node.operation = 'SUBTRACT'
+            links.new(bl_position_node.outputs["Position"], bl_deform_node.inputs[0])
+            links.new(bl_rest_world_node.outputs["Vector"], bl_deform_node.inputs[1])
+
+            bl_sample_deform_node = nodes.new("GeometryNodeSampleIndex")
+            bl_sample_deform_node.data_type = 'FLOAT_VECTOR'
+            bl_sample_deform_node.domain = domain
+            links.new(source_geometry, bl_sample_deform_node.inputs["Geometry"])
+            links.new(bl_deform_node.outputs["Vector"], bl_sample_deform_node.inputs["Value"])
+            links.new(bl_read_index_node.outputs["Attribute"], bl_sample_deform_node.inputs["Index"])
+
+            bl_inverse_node = nodes.new("ShaderNodeVectorMath")
+            bl_inverse_node.operation = 'SUBTRACT'
+            links.new(point_world, bl_inverse_node.inputs[0])
+            links.new(bl_sample_deform_node.outputs["Value"], bl_inverse_node.inputs[1])
+
+            # back to grease pencil local space
+            bl_point_local_node = nodes.new("FunctionNodeTransformPoint")
+            links.new(bl_inverse_node.outputs["Vector"], bl_point_local_node.inputs["Vector"])
+            links.new(target_inverse_matrix, bl_point_local_node.inputs["Transform"])
+
+            bl_set_position_node = nodes.new("GeometryNodeSetPosition")
+            links.new(geometry, bl_set_position_node.inputs["Geometry"])
+            links.new(bl_point_local_node.outputs["Vector"], bl_set_position_node.inputs["Position"])
+            if mask is not None:
+                links.new(mask, bl_set_position_node.inputs["Selection"])
+            geometry = bl_set_position_node.outputs["Geometry"]
+
+        ### Remove the temporary attributes
+
+        for temp_name in (temp_index_name, temp_mask_name):
+            bl_remove_attr_node = nodes.new("GeometryNodeRemoveAttribute")
+            bl_remove_attr_node.inputs["Name"].default_value = temp_name
+            links.new(geometry, bl_remove_attr_node.inputs["Geometry"])
+            geometry = bl_remove_attr_node.outputs["Geometry"]
+
+        # Remove Named Attribute.Geometry -> Group Output.Geometry
+        links.new(geometry, bl_output_node.inputs[0])
 
     # main function
     def execute(self, context):
@@ -85,22 +379,6 @@ class LM_TW_OT_Transfer(bpy.types.Operator):
             """Check if the current Blender version is 4.3 or later"""
             return hasattr(context.scene.lm_tw_target_gp.data.layers[0].frames[0], 'drawing')
         
-        # find the nearest vertex
-        def find_nearest_vertex(point_co, source_vertices):            
-            closest_dist = context.scene.lm_tw_distance
-            if closest_dist == 0:
-                closest_dist = float('inf')
-
-            closest_vert_index = None
-            # Check distance to each vertex in source mesh. If distance is greater than threshold, skip                   
-            for index, pos in source_vertices:
-                dist = (point_co - pos).length
-                if dist < closest_dist:
-                    closest_dist = dist
-                    closest_vert_index = index
-
-            return closest_vert_index
-        
         # find the nearest face
         def find_nearest_face(point_co, source_obj):
             closest_dist = context.scene.lm_tw_distance
@@ -141,6 +419,17 @@ class LM_TW_OT_Transfer(bpy.types.Operator):
                 
             if target.type != 'GPENCIL' and target.type != 'GREASEPENCIL':
                 raise ValueError("Target must be a grease pencil object")
+
+            # check the Geometry Nodes engine can run before changing anything on the target
+            if context.scene.lm_tw_engine == 'NODES':
+                if not is_GP3():
+                    raise ValueError("Geometry Nodes engine requires Blender 4.3 or later")
+
+                # the node engine samples the evaluated source mesh, while the Python engine reads the mesh data.
+                # They match only if the source modifiers just move vertices
+                for modifier in source.modifiers:
+                    if modifier.show_viewport and modifier.type not in self.deform_modifier_types:
+                        raise ValueError("Geometry Nodes engine supports only deform modifiers on the source mesh, disable " + modifier.name + " or use the Python engine")
             
             print("Transferring weights from", source.name, "to", target.name)         
 
@@ -177,8 +466,24 @@ class LM_TW_OT_Transfer(bpy.types.Operator):
                         bpy.ops.object.vertex_group_assign()
                         bpy.ops.object.vertex_group_remove_from()
                 bpy.ops.object.mode_set(mode = "OBJECT")
-                  
-            
+
+
+            # Geometry Nodes engine: the whole transfer is done by a single node group
+            if context.scene.lm_tw_engine == 'NODES':
+                self.transfer_using_geometry_nodes(context, source, target)
+                print("Weight transfer completed successfully.")
+                return {'FINISHED'}
+
+            # Source vertices in their original position, as a (N, 3) array where the row is the vertex index
+            # (the local positions are read only once, in FRAMES mode they are moved to world space on each frame)
+            rest_co = LM_TW_Nearest.vertices_local_co(source.data.vertices)
+            rest_vertices = LM_TW_Nearest.local_to_world(rest_co, source.matrix_world)
+
+            # In CURRENT mode the vertices don't move, so the KD-tree is built only once for all frames
+            rest_tree = None
+            if context.scene.lm_tw_mode == 'CURRENT' and context.scene.lm_tw_nearest == 'VERTEX' and context.scene.lm_tw_search != 'BRUTE_FORCE' and len(rest_vertices) > 0:
+                rest_tree = LM_TW_Nearest.build_kdtree(rest_vertices)
+
             # Loop through all grease pencil layers
             for layer in target.data.layers:
                 # Loop through all frames in this layer
@@ -191,7 +496,7 @@ class LM_TW_OT_Transfer(bpy.types.Operator):
                     print("Processing frame:", frame.frame_number)
 
                     # if we evaluate the mesh in FRAMES mode, we need to store the transformed vertex positions
-                    transformed_vertices = [(v.index, source.matrix_world @ v.co) for v in source.data.vertices]
+                    transformed_vertices = rest_vertices
                     eval_mesh = source.data
                     if context.scene.lm_tw_mode == 'FRAMES':
                         # Evaluate the object to get the transformed vertex positions
@@ -200,8 +505,10 @@ class LM_TW_OT_Transfer(bpy.types.Operator):
                         depsgraph = bpy.context.evaluated_depsgraph_get()
                         eval_obj = source.evaluated_get(depsgraph)
                         eval_mesh = eval_obj.data
-                        # Store original indices and transformed positions
-                        transformed_vertices = [(v.index, source.matrix_world @ v.co) for v in eval_mesh.vertices]
+                        # Original positions with the matrix of this frame, so the object animation is not part of the delta
+                        rest_vertices = LM_TW_Nearest.local_to_world(rest_co, source.matrix_world)
+                        # Store transformed positions (the row is the vertex index)
+                        transformed_vertices = LM_TW_Nearest.vertices_to_array(eval_mesh.vertices, source.matrix_world)
                    
                     drawing = None #compatibilty with 4.2/4.4
                     if is_GP3(): 
@@ -210,17 +517,30 @@ class LM_TW_OT_Transfer(bpy.types.Operator):
                     else: 
                         drawing = frame                  
 
+                    # Get world coordinates of the points of all strokes in this frame
+                    frame_points_co = []
+                    for stroke in drawing.strokes:
+                        if is_GP3():
+                            frame_points_co.append([target.matrix_world @ point.position for point in stroke.points])
+                        else:
+                            frame_points_co.append([target.matrix_world @ point.co for point in stroke.points])
+
+                    # Find closest vertices for all the points of the frame in a single batch
+                    # (the search engine is chosen by the lm_tw_search setting)
+                    frame_closest_verts = None
+                    if context.scene.lm_tw_nearest == 'VERTEX':
+                        frame_points_array = np.array([tuple(co) for stroke_points_co in frame_points_co for co in stroke_points_co], dtype=np.float64).reshape(-1, 3)
+                        frame_closest_verts = LM_TW_Nearest.nearest_vertices(frame_points_array, transformed_vertices, context.scene.lm_tw_distance, context.scene.lm_tw_search, rest_tree)
+                    frame_point_start = 0
+
                     # Loop through all strokes in this frame
                     for stroke_idx, stroke in enumerate(drawing.strokes):
                         # Get stroke points world coordinates
-                        stroke_points_co = None
+                        stroke_points_co = frame_points_co[stroke_idx]
                         stroke_offset = None
                         if is_GP3():
                             # For Blender 4.3 and later we need the stroke offset
-                            stroke_points_co = [target.matrix_world @ point.position for point in stroke.points] 
                             stroke_offset = drawing.curve_offsets[stroke_idx].value
-                        else:   
-                            stroke_points_co = [target.matrix_world @ point.co for point in stroke.points]
                         print("Processing stroke ", stroke_idx+1, "/",len(drawing.strokes)," in frame ", frame.frame_number)
 
                         # For each point in the stroke
@@ -229,14 +549,16 @@ class LM_TW_OT_Transfer(bpy.types.Operator):
                             closest_vert_index = None
                             closest_face_verts = None
                             if context.scene.lm_tw_nearest == 'VERTEX':
-                                # Find closest vertex in source mesh (the function will take care of the difference between current and animated positions)                           
-                                closest_vert_index = find_nearest_vertex(point_co, transformed_vertices)                            
+                                # Closest vertex in source mesh was found for the whole frame (-1 means farther than max distance)
+                                closest_vert_index = int(frame_closest_verts[frame_point_start + point_idx])
+                                if closest_vert_index < 0:
+                                    closest_vert_index = None
                             else:
                                 closest_face_verts = find_nearest_face(point_co, source)
 
                             
                             # Transfer weights from closest vertex
-                            if closest_vert_index or closest_face_verts:
+                            if closest_vert_index is not None or closest_face_verts:
                                 for group in target.vertex_groups:
                                     if group.lock_weight:
                                         # Skip locked vertex groups
@@ -280,15 +602,15 @@ class LM_TW_OT_Transfer(bpy.types.Operator):
                                         delta = None
                                         if context.scene.lm_tw_nearest == 'VERTEX':
                                             # Get the difference between original and transformed position (nearest point)
-                                            original_pos = source.matrix_world @ source.data.vertices[closest_vert_index].co
-                                            transformed_pos = next(pos for idx, pos in transformed_vertices if idx == closest_vert_index)
+                                            original_pos = mathutils.Vector(rest_vertices[closest_vert_index])
+                                            transformed_pos = mathutils.Vector(transformed_vertices[closest_vert_index])
                                             delta = transformed_pos - original_pos
                                         else:
                                             # Calculate average of vertex positions for the face
                                             delta = mathutils.Vector((0,0,0))
                                             for v_index in closest_face_verts:
-                                                original_pos = source.matrix_world @ source.data.vertices[v_index].co
-                                                transformed_pos = next(pos for idx, pos in transformed_vertices if idx == v_index)
+                                                original_pos = mathutils.Vector(rest_vertices[v_index])
+                                                transformed_pos = mathutils.Vector(transformed_vertices[v_index])
                                                 delta += (transformed_pos - original_pos)
                                             delta /= len(closest_face_verts)
 
@@ -299,6 +621,8 @@ class LM_TW_OT_Transfer(bpy.types.Operator):
                                             stroke.points[point_idx].co = target.matrix_world.inverted() @ (point_co - delta)
                                         
 
+                        frame_point_start += len(stroke_points_co)
+
             # If we are in Blender 4.3 or later, we need to copy the temporary attributes to the vertex groups
             if is_GP3():
                 for vgroup in target.vertex_groups:
@@ -65,6 +65,27 @@ class LM_TW_PT_ObjectMode_Panel(bpy.types.Panel):
         ],
         default='VERTEX'
     )
+    bpy.types.Scene.lm_tw_search = bpy.props.EnumProperty(
+        name="Search",
+        description="Nearest vertex search engine",
+        items=[
+            ('AUTO', "Auto", "Choose the fastest engine from mesh size and number of points, using a calibration benchmark"),
+            ('BRUTE_FORCE', "Brute force", "Test all point/vertex pairs in tiles (faster on small meshes)"),
+            ('KDTREE', "KD-tree", "Use a spatial index (faster on dense meshes)"),
+            
+        ],
+        default='AUTO'
+    )
+    bpy.types.Scene.lm_tw_engine = bpy.props.EnumProperty(
+        name="Engine",
+        description="Weight transfer engine",
+        items=[
+            ('PYTHON', "Python", "Transfer weights with Python, point by point"),
+            ('NODES', "Geometry Nodes (4.3+)", "Transfer weights with a geometry nodes group, running multithreaded"),
+            
+        ],
+        default='PYTHON'
+    )
 
     @classmethod
     def poll(cls, context):
@@ -90,6 +111,9 @@ class LM_TW_PT_ObjectMode_Panel(bpy.types.Panel):
         #layout.prop(context.scene, "lm_tw_nearest", expand=True)        
         layout.prop(context.scene, "lm_tw_mode", expand=True)
         layout.prop(context.scene, "lm_tw_distance")
+        layout.prop(context.scene, "lm_tw_engine")
+        if context.scene.lm_tw_engine == 'PYTHON':
+            layout.prop(context.scene, "lm_tw_search")
         layout.label(text= "Transfer")
         layout.operator("lm_tw.transfer")
           
\ No newline at end of file